@@ -1,6 +1,29 @@
 from h2o_wave import Q
 import asyncio
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# address of the flask server, endpoint urls are built from it once at import
+SERVER_ADDRESS = 'http://localhost:4000'
+RAG_QUERY_URL = f'{SERVER_ADDRESS}/rag/query'
+
+# shared session so calls to the flask server reuse keep-alive connections
+session = requests.Session()
+# retry connection errors and transient 5xx responses on the pooled connections,
+# only GETs are retried on status since POSTs create profiles and chat turns
+retry = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({'GET'}),
+    raise_on_status=False,
+)
+# every call goes to the one flask server, so a single pool sized for
+# concurrent dashboard clients is enough
+adapter = HTTPAdapter(pool_connections=1, pool_maxsize=16, max_retries=retry)
+session.mount('http://', adapter)
+session.mount('https://', adapter)
 
 async def stream_chatbot_response(user_input: str, q: Q):
     """
@@ -15,7 +38,13 @@ async def stream_chatbot_response(user_input: str, q: Q):
 
     """
     stream = ''
-    for w in retrieve_chatbot_response(user_input).split():
+    # the request and its JSON parsing block, so run them on a worker thread
+    # to keep the event loop free for other clients while the model answers
+    # the chat session is kept per Wave client so each user only sees their own conversation
+    bot_response, q.client.chat_session_id = await q.run(
+        retrieve_chatbot_response, user_input, q.client.chat_session_id
+    )
+    for w in bot_response.split():
         await asyncio.sleep(0.1)
         stream += w + ' '
         q.page['chat_bot'].data[-1] = [stream, False]
@@ -23,7 +52,7 @@ async def stream_chatbot_response(user_input: str, q: Q):
     await q.page.save()
 
 
-def retrieve_chatbot_response(user_input: str):
+def retrieve_chatbot_response(user_input: str, chat_session_id: str = None):
     """
     Retrieves chatbot responses from an external service.
 
@@ -32,11 +61,14 @@ def retrieve_chatbot_response(user_input: str):
 
     Parameters:
         user_input (str): The input provided by the user to the chatbot.
+        chat_session_id (str): The ID of the client's chat session, a new session is started if None.
 
     Returns:
-        str: The response generated by the chatbot service.
+        tuple: The response generated by the chatbot service and the ID of the chat session.
 
     """
     # send to LLM backend, for now itll be placehold text
-    bot_response = requests.post('http://localhost:4000/rag/query', json={'queries': [user_input]}).json()['replies'][user_input]
-    return bot_response
\ No newline at end of file
+    response = session.post(
+        RAG_QUERY_URL, json={'queries': [user_input], 'chat_session_id': chat_session_id}
+    ).json()
+    return response['replies'][user_input], response['chat_session_id']
\ No newline at end of file
@@ -2,10 +2,7 @@ from h2o_wave import main, app, Q, ui
 from h2o_wave import data as da
 from chatbot import *
 import os
-import os.path
 import asyncio
-import requests
-import json
 
 prev_messages = [
     {"content": f"Message {i}", "from_user": i % 2 == 0} for i in range(100)
@@ -13,6 +10,38 @@ prev_messages = [
 radar_data = []
 LOAD_SIZE = 10
 n_top_candidates = 4
+RADAR_PLOT_URL = f"{SERVER_ADDRESS}/candidate/recommendation/radar-plot"
+TABLE_URL = f"{SERVER_ADDRESS}/candidate/recommendation/table"
+EXPERIENCE_LEVELS_URL = f"{SERVER_ADDRESS}/candidate/experience-levels"
+FILE_UPLOAD_URL = f"{SERVER_ADDRESS}/file/upload"
+# last (etag, data) fetched from each endpoint, so unchanged data is neither resent nor parsed again
+etag_cache = {}
+
+
+def fetch_json(url: str):
+    """
+    Fetch JSON data from the flask server.
+
+    The ETag of the last response is sent as If-None-Match, and the cached
+    data is reused when the server answers 304 Not Modified.
+
+    Parameters:
+        url (str): The url of the endpoint to fetch.
+
+    Returns:
+        list: The records returned by the endpoint.
+
+    """
+    cached = etag_cache.get(url)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    response = session.get(url, headers=headers)
+    if response.status_code == 304 and cached:
+        return cached[1]
+    data = response.json()
+    etag = response.headers.get("ETag")
+    if etag:
+        etag_cache[url] = (etag, data)
+    return data
 
 
 @app("/")
@@ -142,9 +171,14 @@ async def serve(q: Q):
             ],
         )
 
-        radar_data = json.loads(
-            requests.get('http://localhost:4000/candidate/recommendation/radar-plot').json()
+        # Fetch the dashboard data concurrently in background threads
+        # so the requests overlap instead of blocking the event loop one by one
+        radar_data, data, ex_data = await asyncio.gather(
+            q.run(fetch_json, RADAR_PLOT_URL),
+            q.run(fetch_json, TABLE_URL),
+            q.run(fetch_json, EXPERIENCE_LEVELS_URL),
         )
+
         # Create table title:
         q.page["tb_title"] = ui.form_card(
             box=ui.box(zone="rtop", size="0"),
@@ -208,10 +242,6 @@ async def serve(q: Q):
             "Most Rec Job": "candidate_MostRecenJobTitle",
             "Unemployed Duration(M)": "last_employed",
         }
-        data = json.loads(
-            requests.get("http://localhost:4000/candidate/recommendation/table").json()
-        )
-
         q.page["table"] = ui.form_card(
             box="rbottom",
             items=[
@@ -234,22 +264,10 @@ async def serve(q: Q):
         )
 
         # Create Pie Chart (Experience Level Distribution)
-        ex_data = json.loads(
-            requests.get("http://localhost:4000/candidate/experience-levels").json()
-        )
-        junior = 0
-        mideum = 0
-        senior = 0
-        for ex in ex_data:
-            year = ex["candidate_experience"]
-            count = ex["count"]
-
-            if year <= 3:
-                junior += count
-            elif year <= 6:
-                mideum += count
-            else:
-                senior += count
+        # the server counts each experience level in a single query
+        junior = ex_data[0]["junior"]
+        mideum = ex_data[0]["mid"]
+        senior = ex_data[0]["senior"]
         total = junior + mideum + senior
 
         
@@ -337,15 +355,16 @@ async def serve(q: Q):
                 # The file is now available locally; process the file.
                 # To keep this example simple, we just read the file size.
                 #
-                size = os.path.getsize(local_path)
-
                 with open(local_path, "rb") as file:
+                    # size from the open descriptor, no separate stat of the path
+                    size = os.fstat(file.fileno()).st_size
                     files = {
                         "file": (local_path, file),
                     }
 
-                    response = requests.post(
-                        "http://localhost:4000/file/upload", files=files
+                    # post from a worker thread so other clients are served while the resume is processed
+                    response = await q.run(
+                        session.post, FILE_UPLOAD_URL, files=files
                     )
                 print(response.text)
 
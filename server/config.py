@@ -18,9 +18,17 @@ class Config:
     MYSQL_USER = 'root'
     MYSQL_PASSWORD = 'dsa4213'
     MYSQL_PORT = 3306
+    # each dashboard refresh runs three queries at once, sized for a few concurrent clients
+    MYSQL_POOL_SIZE = 10
+    # seconds to wait for a free pooled connection before failing the request
+    MYSQL_POOL_TIMEOUT = 10
 
     # local database
     # MYSQL_HOST = 'localhost'
     # MYSQL_USER = 'root'
     # MYSQL_PASSWORD = 'root'
     # MYSQL_DB = 'dsa4213'
+
+    # seconds to cache candidate recommendation queries
+    CACHE_TTL = 30
+    CACHE_MAX_SIZE = 256
@@ -1,4 +1,3 @@
-import os
 from flask import Flask
 from config import Config
 #from flask_cors import CORS
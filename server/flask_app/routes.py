@@ -1,11 +1,46 @@
 import os
 from flask import current_app as app, jsonify, request, make_response
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from utils import *
 from .services.rag_service import *
 from .services.recommendation_service import *
 from .services.profile_service import *
 
+@app.errorhandler(Exception)
+def handle_exception(e):
+    """
+    Error handler shared by all endpoints.
+
+    HTTP errors keep their status code, any other exception is reported as a 500.
+
+    Parameters:
+        e (Exception): The exception raised while handling the request.
+
+    Returns:
+        Response: JSON response with the error message.
+    """
+    if isinstance(e, HTTPException):
+        return jsonify({'error': e.description}), e.code
+    return jsonify({'error': str(e)}), 500
+
+def conditional_json(data):
+    """
+    Build a JSON response tagged with an ETag of its content.
+
+    If the request's If-None-Match header matches, the response becomes a
+    304 Not Modified without a body.
+
+    Parameters:
+        data: The JSON serializable response data.
+
+    Returns:
+        Response: The JSON response, or a 304 response if the client is up to date.
+    """
+    response = jsonify(data)
+    response.add_etag()
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     """
@@ -42,37 +77,30 @@ def upload_file():
 
     for file in files:
         if file.filename == '':
-            error_message = jsonify({'status','No file selected'})
+            error_message = jsonify({'status':'No file selected'})
             response = make_response(error_message, 400)
             return response
     
         if file and allowed_file(file.filename):
-            try:
-                filename = secure_filename(file.filename)
-                filenames.append(filename)
-                file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))               
-            except Exception as e:
-                return jsonify({'error': str(e)}), 500
-
-    try:
-
-        # current the app is customized for software engineer role
-
-        position = "software engineer"
-        region = "singapore"
-        department = "R&D"
-        
-        # generate candidate profile
-        profile = create_profile(filenames, position, region, department)
-        data={
-            'status': 'File uploaded successfully',
-            'status': 'File uploaded successfully',
-            'data' : profile
-        }
-        response = make_response(data, 200)
-        return response
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            filename = secure_filename(file.filename)
+            filenames.append(filename)
+            file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+
+    # current the app is customized for software engineer role
+
+    position = "software engineer"
+    region = "singapore"
+    department = "R&D"
+    
+    # generate candidate profile
+    profile = create_profile(filenames, position, region, department)
+    data={
+        'status': 'File uploaded successfully',
+        'status': 'File uploaded successfully',
+        'data' : profile
+    }
+    response = make_response(data, 200)
+    return response
 
 @app.route('/rag/query', methods=['POST'])
 @app.route('/rag/query', methods=['POST'])
@@ -89,14 +117,14 @@ def rag_query():
     Returns:
         Response: JSON response with replies from the RAG service.
     """
-    try:
-        queries = request.get_json().get('queries')
-        replies = rag_query_service(queries)
-        success_message = jsonify({"replies":replies})
-        response = make_response(success_message, 200)
-        return response
-    except Exception as e:
-        return jsonify({'error':str(e)}), 500
+    body = request.get_json()
+    queries = body.get('queries')
+    # each chatbot client keeps its own conversation, a new one is started when no session is given
+    chat_session_id = body.get('chat_session_id') or get_client().create_chat_session(get_collection_id())
+    replies = rag_query_service(queries, chat_session_id=chat_session_id)
+    success_message = jsonify({"replies":replies, "chat_session_id":chat_session_id})
+    response = make_response(success_message, 200)
+    return response
     
     
 @app.route('/rag/summary', methods=['GET','POST'])
@@ -113,14 +141,11 @@ def rag_summary():
     Returns:
         Response: JSON response with summaries of the documents.
     """
-    try:
-        filenames=request.get_json().get('filenames')
-        summaries = rag_summary_service(filenames)
-        success_message = jsonify({"summaries":summaries})
-        response = make_response(success_message,200)
-        return response
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    filenames=request.get_json().get('filenames')
+    summaries = rag_summary_service(filenames)
+    success_message = jsonify({"summaries":summaries})
+    response = make_response(success_message,200)
+    return response
  
 @app.route('/candidate/recommendation/table', methods=['GET'])
 def candidate_rank():
@@ -136,14 +161,11 @@ def candidate_rank():
     Returns:    
         Response: JSON response with the candidate recommendation table.
     """
-    try:
-        position = request.args.get('position', "position_applied")
-        region = request.args.get('region', "region")
-        dept = request.args.get('dept', "department")
-        limit = request.args.get('limit', 10)
-        return jsonify(candidates_table(position, region, dept, limit))
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    position = request.args.get('position', "position_applied")
+    region = request.args.get('region', "region")
+    dept = request.args.get('dept', "department")
+    limit = request.args.get('limit', 10, type=int)
+    return conditional_json(candidates_table(position, region, dept, limit))
     
 @app.route('/candidate/recommendation/radar-plot', methods=['GET'])
 def candidate_radar_plot():
@@ -159,14 +181,11 @@ def candidate_radar_plot():
     Returns:
         Response: JSON response with the candidate recommendation radar plot.
     """
-    try:
-        position = request.args.get('position', "position_applied")
-        region = request.args.get('region', "region")
-        dept = request.args.get('dept', "department")
-        limit = request.args.get('limit', 4)
-        return jsonify(radar_plot(position, region, dept, limit))
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    position = request.args.get('position', "position_applied")
+    region = request.args.get('region', "region")
+    dept = request.args.get('dept', "department")
+    limit = request.args.get('limit', 4, type=int)
+    return conditional_json(radar_plot(position, region, dept, limit))
     
 @app.route('/candidate/experience-levels', methods=['GET'])
 def candidate_experience_distribution():
@@ -182,10 +201,7 @@ def candidate_experience_distribution():
     Returns:    
         Response: JSON response with the candidate experience distribution.
     """
-    try:
-        position = request.args.get('position', "position_applied")
-        region = request.args.get('region', "region")
-        dept = request.args.get('dept', "department")
-        return jsonify(experience_distribution(position, region, dept))
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+    position = request.args.get('position', "position_applied")
+    region = request.args.get('region', "region")
+    dept = request.args.get('dept', "department")
+    return conditional_json(experience_distribution(position, region, dept))
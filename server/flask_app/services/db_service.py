@@ -0,0 +1,47 @@
+from flask import current_app as app
+from mysql.connector import errors, pooling
+import threading
+import time
+
+# the pool is created on first use and shared by every service, so requests
+# reuse open connections instead of doing a fresh handshake each time
+_pool = None
+_pool_lock = threading.Lock()
+
+# seconds between attempts to get a connection while every pooled connection is in use
+POOL_RETRY_INTERVAL = 0.05
+
+def connect_to_db():
+    """
+    Get a connection to the MySQL database from the shared connection pool.
+
+    The pool is created from the app's configuration settings on first use.
+    When every connection is in use, waits up to MYSQL_POOL_TIMEOUT seconds for one
+    to be returned. Closing the returned connection hands it back to the pool.
+
+    Returns:
+        mysql.connector.pooling.PooledMySQLConnection: The pooled connection to the MySQL database.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='dsa4213',
+                    pool_size=app.config['MYSQL_POOL_SIZE'],
+                    host=app.config['MYSQL_HOST'],
+                    user=app.config['MYSQL_USER'],
+                    password=app.config['MYSQL_PASSWORD'],
+                    database=app.config['MYSQL_DATABASE'],
+                    port=app.config['MYSQL_PORT'],
+                )
+
+    # the pool raises straight away when it is exhausted instead of blocking
+    deadline = time.monotonic() + app.config['MYSQL_POOL_TIMEOUT']
+    while True:
+        try:
+            return _pool.get_connection()
+        except errors.PoolError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(POOL_RETRY_INTERVAL)
@@ -1,24 +1,63 @@
-from flask import current_app as app
 from .rag_service import rag_query_service
-import mysql.connector
+from .db_service import connect_to_db
+from .recommendation_service import invalidate_cache
+from contextlib import closing
 import json
 import re
 
-def connect_to_db():
-    """
-    Connect to the MySQL database using the app's configuration settings.
-    
-    Returns:
-        mysql.connector.connection.MySQLConnection: The connection object to the MySQL database.
-    """
-    connection = mysql.connector.connect(
-        host=app.config['MYSQL_HOST'],
-        user=app.config['MYSQL_USER'],
-        password=app.config['MYSQL_PASSWORD'],
-        database=app.config['MYSQL_DB'],
-        # port=app.config['MYSQL_PORT']
-    )
-    return connection
+# prompt, insert statement and reply fields are fixed, so they are built once at import
+PROFILE_PROMPT = " \
+    Please give me the following information in a json format: \
+    candidate's name (NaN if not specified) as candidateName, \
+    candidate's gender (NaN if not specified) as candidateGender, \
+    candidate's experience score related to the position: {position}, with an int ranging from 1-10 as candidateExperience, \
+    candidate's most recent job title as candidateMostRecentJobTitle, \
+    candidate's highest education certificate as candidateEducation, \
+    candidate's best technical strength in one word as candidateStrength, \
+    candidate's most recent job ending time as candidateMostRecentJobTime, \
+    candidate's api design experience score with a float ranging from 0-10 as apiDesignExperience (0 if Nan), \
+    candidate's framework Knowledge score with a float ranging from 0-10 as framework knowledge (0 if Nan), \
+    candidate's database skills score with a float ranging from 0-10 as databseSkill (0 if Nan), \
+    candidate's cybersecurity knowledge score with a float ranging from 0-10 as cybersecurityKnowledge(0 if Nan), \
+    candidate's app development experience score with a float ranging from 0-10 as appDevExperience(0 if Nan), \
+    "
+
+INSERT_CANDIDATE_SQL = """INSERT INTO candidates 
+        (candidate_name, 
+        candidate_gender,
+        candidate_experience, 
+        candidate_MostRecenJobTitle, 
+        candidate_education, 
+        candidate_strength, 
+        candidate_MostRescentJobTime, 
+        apiDesignExperience, 
+        frameworkKnowledge, 
+        databaseSkill, 
+        cybersecurityKnowledge,
+        appDevExperience, 
+        position_applied, 
+        region, 
+        department) 
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
+
+# matches the JSON object embedded in the LLM's reply
+JSON_OBJECT_PATTERN = re.compile(r'{.*}')
+
+# reply keys in the same order as the candidate columns of INSERT_CANDIDATE_SQL
+PROFILE_FIELDS = (
+    'candidateName',
+    'candidateGender',
+    'candidateExperience',
+    'candidateMostRecentJobTitle',
+    'candidateEducation',
+    'candidateStrength',
+    'candidateMostRecentJobTime',
+    'apiDesignExperience',
+    'frameworkKnowledge',
+    'databaseSkill',
+    'cybersecurityKnowledge',
+    'appDevExperience',
+)
 
 def create_profile(filenames:list, position:str, region:str, department:str):
     """
@@ -33,34 +72,12 @@ def create_profile(filenames:list, position:str, region:str, department:str):
     Returns:
         dict: The candidate profile data extracted from the RAG service.
     """
-    # Connect to the MySQL database
-    connection = connect_to_db()
-
-    # Create a cursor object to execute SQL queries
-    cursor = connection.cursor()
-
-    prompts = [
-        f" \
-        Please give me the following information in a json format: \
-        candidate's name (NaN if not specified) as candidateName, \
-        candidate's gender (NaN if not specified) as candidateGender, \
-        candidate's experience score related to the position: {position}, with an int ranging from 1-10 as candidateExperience, \
-        candidate's most recent job title as candidateMostRecentJobTitle, \
-        candidate's highest education certificate as candidateEducation, \
-        candidate's best technical strength in one word as candidateStrength, \
-        candidate's most recent job ending time as candidateMostRecentJobTime, \
-        candidate's api design experience score with a float ranging from 0-10 as apiDesignExperience (0 if Nan), \
-        candidate's framework Knowledge score with a float ranging from 0-10 as framework knowledge (0 if Nan), \
-        candidate's database skills score with a float ranging from 0-10 as databseSkill (0 if Nan), \
-        candidate's cybersecurity knowledge score with a float ranging from 0-10 as cybersecurityKnowledge(0 if Nan), \
-        candidate's app development experience score with a float ranging from 0-10 as appDevExperience(0 if Nan), \
-        "
-    ]
+    prompts = [PROFILE_PROMPT.format(position=position)]
     # use predefined prompts to query LLM
     replies = rag_query_service(prompts, filenames)
 
     # Use regex to extract JSON information
-    json_data = re.search(r'{.*}', replies[prompts[0]].replace("\n", ""))
+    json_data = JSON_OBJECT_PATTERN.search(replies[prompts[0]].replace("\n", ""))
     if json_data:
         json_data = json_data.group()
     else:
@@ -71,46 +88,14 @@ def create_profile(filenames:list, position:str, region:str, department:str):
     print(profile)
 
 
-    # store the extracted data in database
-    sql = """INSERT INTO candidates 
-            (candidate_name, 
-            candidate_gender,
-            candidate_experience, 
-            candidate_MostRecenJobTitle, 
-            candidate_education, 
-            candidate_strength, 
-            candidate_MostRescentJobTime, 
-            apiDesignExperience, 
-            frameworkKnowledge, 
-            databaseSkill, 
-            cybersecurityKnowledge,
-            appDevExperience, 
-            position_applied, 
-            region, 
-            department) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
-            
-    cursor.execute(
-        sql, 
-        (profile.get('candidateName'), 
-        profile.get('candidateGender'),
-        profile.get('candidateExperience'), 
-        profile.get('candidateMostRecentJobTitle'), 
-        profile.get('candidateEducation'), 
-        profile.get("candidateStrength"), 
-        profile.get("candidateMostRecentJobTime"), 
-        profile.get("apiDesignExperience"), 
-        profile.get("frameworkKnowledge"), 
-        profile.get("databaseSkill"), 
-        profile.get("cybersecurityKnowledge"),
-        profile.get("appDevExperience"), 
-        position, 
-        region, 
-        department))
-
-    connection.commit()
-    cursor.close()
-    connection.close()
+    # store the extracted data in database, the connection is only taken once the slow
+    # LLM query is done and is handed back to the pool even if the insert fails
+    with closing(connect_to_db()) as connection, closing(connection.cursor()) as cursor:
+        cursor.execute(
+            INSERT_CANDIDATE_SQL,
+            tuple(profile.get(field) for field in PROFILE_FIELDS) + (position, region, department))
+        connection.commit()
+    invalidate_cache()
     
     return profile
 
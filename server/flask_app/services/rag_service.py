@@ -1,20 +1,101 @@
 from h2ogpte import H2OGPTE
-from flask import current_app as app, jsonify, request
+from flask import current_app as app
+from werkzeug.utils import secure_filename
 import os
 import json
-# create a H2OGPT client
-client = H2OGPTE(
-    address=app.config['H2O_ADDRESS'],
-    api_key=app.config['H2O_API_KEY'],
-)
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+# the client and collection are created on first use rather than at import,
+# so importing the routes does not block on network round-trips to H2O
+_client = None
+_collection_id = None
+# requests run on threads, the lock makes sure only one client and collection are ever created
+_init_lock = threading.RLock()
 
-# create a collection
-collection_id = client.create_collection(
-    name='Resume',
-    description='ResumeAnalysis',
+# retry policy for queries that time out
+MAX_QUERY_ATTEMPTS = 5
+INITIAL_RETRY_INTERVAL = 1.0
+MAX_RETRY_INTERVAL = 10.0
+RETRY_BACKOFF_FACTOR = 2
+# delay before each retry, the schedule only depends on the attempt number
+RETRY_DELAYS = tuple(
+    min(MAX_RETRY_INTERVAL, INITIAL_RETRY_INTERVAL * RETRY_BACKOFF_FACTOR ** i)
+    for i in range(MAX_QUERY_ATTEMPTS - 1)
 )
 
-def rag_file_upload_service(filenames:list, client=client, collection_id=collection_id):
+# number of files uploaded concurrently
+MAX_UPLOAD_WORKERS = 4
+
+# number of documents summarized concurrently
+MAX_SUMMARY_WORKERS = 8
+
+# number of documents fetched per page when listing a collection
+DOCUMENT_PAGE_SIZE = 100
+
+# (collection_id, sha256 of file content) for every file already ingested,
+# so re-uploading the same resume does not pay for another upload and ingest
+_ingested_files = set()
+
+# summaries by document id, an ingested document never changes so its summary can be reused
+_summaries = {}
+
+def get_client():
+    """
+    Get the shared H2OGPTE client, creating it on first use.
+
+    Returns:
+        H2OGPTE: The H2OGPTE client.
+    """
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                _client = H2OGPTE(
+                    address=app.config['H2O_ADDRESS'],
+                    api_key=app.config['H2O_API_KEY'],
+                )
+    return _client
+
+def get_collection_id():
+    """
+    Get the ID of the resume collection, creating the collection on first use.
+
+    Returns:
+        str: The ID of the collection.
+    """
+    global _collection_id
+    if _collection_id is None:
+        with _init_lock:
+            if _collection_id is None:
+                _collection_id = get_client().create_collection(
+                    name='Resume',
+                    description='ResumeAnalysis',
+                )
+    return _collection_id
+
+def iter_documents(client, collection_id):
+    """
+    Iterate over every document in a collection, fetching one page at a time.
+
+    Parameters:
+        client (H2OGPTE): The H2OGPTE client to use for listing.
+        collection_id (str): The ID of the collection to list.
+
+    Returns:
+        generator: The documents in the collection.
+    """
+    offset = 0
+    while True:
+        page = client.list_documents_in_collection(collection_id, offset=offset, limit=DOCUMENT_PAGE_SIZE)
+        yield from page
+        if len(page) < DOCUMENT_PAGE_SIZE:
+            return
+        offset += len(page)
+
+def rag_file_upload_service(filenames:list, client=None, collection_id=None):
     """
     Uploads files to the H2O platform and ingests them into the collection.
 
@@ -26,16 +107,38 @@ def rag_file_upload_service(filenames:list, client=client, collection_id=collect
     Returns:
         None
     """
-    upload_files=[]
+    client = client or get_client()
+    collection_id = collection_id or get_collection_id()
+
+    paths=[]
+    ingested_keys=[]
     
     for filename in filenames:  
-        with open(os.path.join(app.config['UPLOAD_FOLDER'], filename), 'rb') as f:
-            upload_files.append(client.upload(os.path.join(app.config['UPLOAD_FOLDER'], filename), f))
+        path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        with open(path, 'rb') as f:
+            # skip files whose content is already in the collection
+            key = (collection_id, hashlib.sha256(f.read()).hexdigest())
+        if key in _ingested_files or key in ingested_keys:
+            continue
+        paths.append(path)
+        ingested_keys.append(key)
+
+    if not paths:
+        return
+
+    def upload(path):
+        with open(path, 'rb') as f:
+            return client.upload(path, f)
+
+    # Upload the files concurrently, each upload is an independent request
+    with ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS) as executor:
+        upload_files = list(executor.map(upload, paths))
 
     # Ingest documents (Creates previews, chunks and embeddings)
     client.ingest_uploads(collection_id, upload_files)
+    _ingested_files.update(ingested_keys)
 
-def rag_query_service(queries:list, filenames=None, client=client, collection_id=collection_id):
+def rag_query_service(queries:list, filenames=None, client=None, collection_id=None, chat_session_id=None):
     """
     Query the RAG service with the provided prompts and return the replies.
 
@@ -44,18 +147,36 @@ def rag_query_service(queries:list, filenames=None, client=client, collection_id
         filenames (list): The list of filenames to upload and ingest.
         client (H2OGPTE): The H2OGPTE client to use for querying.
         collection_id (str): The ID of the collection to query.
+        chat_session_id (str): The ID of the chat session to query in, a new session is created if None.
 
     Returns:
         dict: The replies from the RAG service for each prompt.
     """
-    # upload the file to h2o platform
-    if filenames:
-        rag_file_upload_service(filenames)
-    
-    # Create a chat session
-    chat_session_id = client.create_chat_session(collection_id)
+    client = client or get_client()
+    collection_id = collection_id or get_collection_id()
+
+    if chat_session_id is None and filenames:
+        # Create a chat session while the file is uploaded to h2o platform, the session
+        # does not depend on the upload so both round trips run at the same time
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            new_session = executor.submit(client.create_chat_session, collection_id)
+            try:
+                rag_file_upload_service(filenames, client, collection_id)
+            except Exception:
+                # do not leave the unused session behind on the server
+                client.delete_chat_sessions([new_session.result()])
+                raise
+            chat_session_id = new_session.result()
+    else:
+        # upload the file to h2o platform
+        if filenames:
+            rag_file_upload_service(filenames, client, collection_id)
+
+        # Create a chat session
+        if chat_session_id is None:
+            chat_session_id = client.create_chat_session(collection_id)
 
-    # Query the collection
+    # Query the collection, all queries share the one connected session
     replies={}
     with client.connect(chat_session_id) as session:
         for q in queries:
@@ -70,43 +191,58 @@ def rag_query_service(queries:list, filenames=None, client=client, collection_id
                     break
                 except TimeoutError:
                     i+=1
-                    if i == 5:
-                        replies[q] = "Timed out after 5 attempts. Please try again later."
+                    if i == MAX_QUERY_ATTEMPTS:
+                        replies[q] = f"Timed out after {MAX_QUERY_ATTEMPTS} attempts. Please try again later."
                         break
+                    # back off with jitter so retries do not pile onto a busy server
+                    delay = RETRY_DELAYS[i - 1]
+                    time.sleep(random.uniform(delay / 2, delay))
                     continue
                 except json.JSONDecodeError as json_error:
                     replies[q] = f"Error decoding JSON content: {json_error}"
+                    break
                 except Exception as e:
                 # Handle other exceptions (e.g., connection errors)
                     replies[q] = f"Error occurred: {e}"
                     break
-            break
     
     return replies
 
 
-def rag_summary_service(client=client, collection_id=collection_id):
+def rag_summary_service(filenames=None, client=None, collection_id=None):
     """
     Summarize the documents in the collection.
 
     Parameters:
+        filenames (list): The filenames of the documents to summarize, all documents are summarized if None.
         client (H2OGPTE): The H2OGPTE client to use for summarization.
         collection_id (str): The ID of the collection to summarize.
 
     Returns:
-        list: The summaries of the documents in the collection.
+        list: The summaries of the selected documents.
     """
-    # Create a chat session
-    chat_session_id = client.create_chat_session_on_default_collection()
-    
-    # Summarize each document
-    summaries = []
-    documents = client.list_documents_in_collection(collection_id, offset=0, limit=99)
-    for doc in documents:
-        summary = client.summarize_document(
-            document_id=doc.id,
-            timeout=60,
-        )
-        summaries.append(summary.content)
+    client = client or get_client()
+    collection_id = collection_id or get_collection_id()
+
+    # Summarize the documents concurrently, the summary jobs are independent
+    # so the total wait is the slowest job rather than the sum of all jobs
+    documents = iter_documents(client, collection_id)
+    if filenames:
+        # only summarize the requested files instead of the whole collection, the names are
+        # secured the same way as on upload so they match the names the files are stored under
+        filenames = {secure_filename(filename) for filename in filenames}
+        documents = (doc for doc in documents if os.path.basename(doc.name) in filenames)
+
+    def summarize(doc):
+        if doc.id not in _summaries:
+            summary = client.summarize_document(
+                document_id=doc.id,
+                timeout=60,
+            )
+            _summaries[doc.id] = summary.content
+        return _summaries[doc.id]
+
+    with ThreadPoolExecutor(max_workers=MAX_SUMMARY_WORKERS) as executor:
+        summaries = list(executor.map(summarize, documents))
     
     return summaries
\ No newline at end of file
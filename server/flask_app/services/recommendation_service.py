@@ -1,23 +1,120 @@
-import mysql.connector
-import pandas as pd
-from flask import current_app as app, jsonify, request
+from .db_service import connect_to_db
+from flask import current_app as app
+from collections import OrderedDict
+from contextlib import closing
+import functools
+import threading
+import time
+
+# query results keyed by (function name, arguments), each stored with the time it was cached,
+# kept in least recently used order so the oldest entry is evicted once CACHE_MAX_SIZE is reached
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+# queries currently being run, keyed like the cache, so identical concurrent requests wait for one result
+_inflight = {}
+# bumped on every invalidation, a query started before the latest invalidation is not cached
+_generation = 0
+
+def cached(func):
+    """
+    Cache the results of a read-only query for CACHE_TTL seconds. Concurrent calls with the
+    same arguments on a cache miss share a single query.
+
+    Parameters:
+        func (function): The query function to cache.
+
+    Returns:
+        function: The wrapped query function.
+    """
+    @functools.wraps(func)
+    def wrapper(*args):
+        key = (func.__name__, args)
+        while True:
+            with _cache_lock:
+                hit = _cache.get(key)
+                if hit is not None and time.monotonic() - hit[0] < app.config['CACHE_TTL']:
+                    _cache.move_to_end(key)
+                    return hit[1]
+                pending = _inflight.get(key)
+                if pending is None:
+                    _inflight[key] = threading.Event()
+                    generation = _generation
+                    break
+            # another request is running this query, check the cache again once it is done
+            # (if it failed, the next waiter runs the query itself)
+            pending.wait()
+        try:
+            result = func(*args)
+            with _cache_lock:
+                # the result may predate a candidate stored while the query ran
+                if generation == _generation:
+                    _cache[key] = (time.monotonic(), result)
+                    _cache.move_to_end(key)
+                    if len(_cache) > app.config['CACHE_MAX_SIZE']:
+                        _cache.popitem(last=False)
+        finally:
+            with _cache_lock:
+                _inflight.pop(key).set()
+        return result
+    return wrapper
+
+def invalidate_cache():
+    """
+    Drop all cached query results, e.g. after a new candidate is stored.
+    """
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.clear()
+
+# the candidate columns that can be filtered on, in the order the filter arguments are passed
+FILTER_COLUMNS = ("position_applied", "region", "department")
+
+def filter_clause(position, region, dept):
+    """
+    Build the WHERE clause for the optional candidate filters. A filter left at its
+    column name matches every row where the column is set.
+
+    Parameters:
+        position (str): The position applied for by the candidate.
+        region (str): The region where the candidate is applying.
+        dept (str): The department where the candidate is applying.
 
-def connect_to_db():
+    Returns:
+        tuple: The WHERE clause and the list of values for its placeholders.
     """
-    Connect to the MySQL database using the configuration provided in the Flask app.
+    # the values are sent as query parameters so the driver escapes them
+    # instead of them being formatted into the SQL
+    conditions, params = [], []
+    for column, value in zip(FILTER_COLUMNS, (position, region, dept)):
+        if value != column:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+        else:
+            conditions.append(f"{column} = {column}")
+    return " AND ".join(conditions), params
+
+def fetch_records(query, params):
+    """
+    Run a SELECT query on the MySQL database and fetch all the rows.
+
+    Parameters:
+        query (str): The SQL query to execute.
+        params (list): The values for the query placeholders.
 
     Returns:
-        mysql.connector.connection.MySQLConnection: The connection object to the MySQL database.
+        list: The rows returned by the query as records.
     """
-    connection = mysql.connector.connect(
-        host=app.config['MYSQL_HOST'],
-        user=app.config['MYSQL_USER'],
-        password=app.config['MYSQL_PASSWORD'],
-        database=app.config['MYSQL_DB'],
-        # port=app.config['MYSQL_PORT']
-    )
-    return connection
+    # Connect to the MySQL database and create a cursor object to execute SQL queries, rows are
+    # returned as dicts keyed by column name; both are closed even if the query fails so the
+    # connection always goes back to the pool
+    with closing(connect_to_db()) as connection, closing(connection.cursor(dictionary=True)) as cursor:
+        cursor.execute(query, params)
 
+        # Fetch all the rows returned by the query as records
+        return cursor.fetchall()
+
+@cached
 def candidates_table(position, region, dept, k: int=10):
     """
     Get the candidate data from the MySQL database.
@@ -29,33 +126,9 @@ def candidates_table(position, region, dept, k: int=10):
         k (int): The number of candidates to return.
 
     Returns:
-        str: The candidate data in JSON format.
+        list: The candidate data as a list of records.
     """
-    # Connect to the MySQL database
-    connection = connect_to_db()
-
-    # Create a cursor object to execute SQL queries
-    cursor = connection.cursor()
-
-    # Create optional filter
-    position = (
-        f"position_applied = '{position}'" 
-        if position != "position_applied" 
-        else f"position_applied = {position}"
-    )
-    
-    region = (
-        f"region = '{region}'" 
-        if region != "region" 
-        else f"region = {region}"
-    )
-
-    dept = (
-        f"department = '{dept}'" 
-        if dept != "department" 
-        else f"department = {dept}"
-    )
-
+    where, params = filter_clause(position, region, dept)
 
     # Execute a SELECT query
     query = f"""
@@ -72,23 +145,12 @@ def candidates_table(position, region, dept, k: int=10):
                     NOW()
                 ) AS last_employed
             FROM candidates
-            WHERE {position} AND {region} AND {dept}
-            LIMIT {k}
+            WHERE {where}
+            LIMIT %s
             """
-    cursor.execute(query)
-
-    # Get column names
-    field_names = [i[0] for i in cursor.description]
-    
-    # Fetch all the rows returned by the query
-    rows = cursor.fetchall()    
-    df = pd.DataFrame(rows, columns=field_names)
-
-    # Close the cursor and the database connection
-    cursor.close()
-    connection.close()
-    return df.to_json(orient="records", index=False)
+    return fetch_records(query, params + [k])
 
+@cached
 def radar_plot(position, region, dept, k: int=4):
     """
     Get the candidate data from the MySQL database.
@@ -100,32 +162,9 @@ def radar_plot(position, region, dept, k: int=4):
         k (int): The number of candidates to return.
 
     Returns:
-        str: The candidate data in JSON format.
+        list: The candidate data as a list of records.
     """
-    # Connect to the MySQL database
-    connection = connect_to_db()
-
-    # Create a cursor object to execute SQL queries
-    cursor = connection.cursor()
-
-    # Create optional filter
-    position = (
-        f"position_applied = '{position}'" 
-        if position != "position_applied" 
-        else f"position_applied = {position}"
-    )
-    
-    region = (
-        f"region = '{region}'" 
-        if region != "region" 
-        else f"region = {region}"
-    )
-
-    dept = (
-        f"department = '{dept}'" 
-        if dept != "department" 
-        else f"department = {dept}"
-    )
+    where, params = filter_clause(position, region, dept)
 
     # Execute a SELECT query
     query = f"""
@@ -134,32 +173,18 @@ def radar_plot(position, region, dept, k: int=4):
                 frameworkKnowledge,
                 databaseSkill,
                 cybersecurityKnowledge,
-                appDevExperience,
-                (apiDesignExperience + frameworkKnowledge + databaseSkill + cybersecurityKnowledge + appDevExperience) AS total_score
+                appDevExperience
             FROM candidates
-            WHERE {position} AND {region} AND {dept}
-            ORDER BY total_score DESC
-            LIMIT {k}
+            WHERE {where}
+            ORDER BY (apiDesignExperience + frameworkKnowledge + databaseSkill + cybersecurityKnowledge + appDevExperience) DESC
+            LIMIT %s
             """
-    
-    cursor.execute(query)
-
-    # Get column names
-    field_names = [i[0] for i in cursor.description]
-    
-    # Fetch all the rows returned by the query
-    rows = cursor.fetchall()    
-    df = pd.DataFrame(rows, columns=field_names)
-    df = df.drop(columns=["total_score"])
-
-    # Close the cursor and the database connection
-    cursor.close()
-    connection.close()
-    return df.to_json(orient="records", index=False)
+    return fetch_records(query, params + [k])
 
+@cached
 def experience_distribution(position, region, dept):
     """
-    Get the candidate data from the MySQL database.
+    Get the number of junior (0-3 years), mid (3-6 years) and senior (>6 years) candidates from the MySQL database.
 
     Parameters:
         position (str): The position applied for by the candidate.
@@ -167,54 +192,17 @@ def experience_distribution(position, region, dept):
         dept (str): The department where the candidate is applying.
 
     Returns:
-        str: The candidate data in JSON format.
+        list: The candidate data as a list of records.
     """
-
-    # Connect to the MySQL database
-    connection = connect_to_db()
-
-    # Create a cursor object to execute SQL queries
-    cursor = connection.cursor()
-
-    # Create optional filter
-    position = (
-        f"position_applied = '{position}'" 
-        if position != "position_applied" 
-        else f"position_applied = {position}"
-    )
-    
-    region = (
-        f"region = '{region}'" 
-        if region != "region" 
-        else f"region = {region}"
-    )
-
-    dept = (
-        f"department = '{dept}'" 
-        if dept != "department" 
-        else f"department = {dept}"
-    )
+    where, params = filter_clause(position, region, dept)
 
     # Execute a SELECT query
     query = f"""
             SELECT 
-                candidate_experience,
-                COUNT(*) AS count
+                COUNT(CASE WHEN candidate_experience <= 3 THEN 1 END) AS junior,
+                COUNT(CASE WHEN candidate_experience > 3 AND candidate_experience <= 6 THEN 1 END) AS mid,
+                COUNT(CASE WHEN candidate_experience > 6 THEN 1 END) AS senior
             FROM candidates
-            WHERE {position} AND {region} AND {dept}
-            GROUP BY candidate_experience
+            WHERE {where}
             """
-    
-    cursor.execute(query)
-
-    # Get column names
-    field_names = [i[0] for i in cursor.description]
-    
-    # Fetch all the rows returned by the query
-    rows = cursor.fetchall()    
-    df = pd.DataFrame(rows, columns=field_names)
-
-    # Close the cursor and the database connection
-    cursor.close()
-    connection.close()
-    return df.to_json(orient="records", index=False)
+    return fetch_records(query, params)
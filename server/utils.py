@@ -1,3 +1,6 @@
+# built once at import instead of on every call
+ALLOWED_EXTENSIONS = frozenset({'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'docx'})
+
 def allowed_file(filename):
     """
     Check if a filename has an allowed file extension.
@@ -9,6 +12,5 @@ def allowed_file(filename):
         bool: True if the filename has an allowed extension, False otherwise.
 
     """
-    ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'docx'}
     return '.' in filename and \
         filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS